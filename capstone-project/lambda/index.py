@@ -1,53 +1,718 @@
 import json
-import boto3
+import os
+import base64
+import gzip
+import hashlib
+import random
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table('TodosTable')
+import storage
+
+# Optional speed-ups: orjson serializes several times faster than the
+# standard library, and brotli compresses JSON tighter than gzip. Both are
+# used only when they are bundled with the deployment package.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Configuration comes from the Lambda environment. STORAGE_BACKEND=memory or
+# sqlite runs the handler without AWS; DYNAMODB_ENDPOINT points it at
+# DynamoDB Local (or any other stand-in), e.g. http://localhost:8000
+TABLE_NAME = os.environ.get('TODOS_TABLE', 'TodosTable')
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'dynamodb')
+DYNAMODB_ENDPOINT = os.environ.get('DYNAMODB_ENDPOINT')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', ':memory:')
+COMPLETED_INDEX = os.environ.get('TODOS_COMPLETED_INDEX', 'CompletedIndex')
+OPEN_INDEX = os.environ.get('TODOS_OPEN_INDEX', 'OpenTodosIndex')
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '256'))
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', str(8 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '30'))
+CACHE_VERSION_CHECK_SECONDS = float(os.environ.get('CACHE_VERSION_CHECK_SECONDS', '2'))
+# GSI queries are eventually consistent, so their results are not cached
+# until this long after the last write this container knows of
+CACHE_INDEX_SETTLE_SECONDS = float(os.environ.get('CACHE_INDEX_SETTLE_SECONDS', '2'))
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', '1024'))
+# The export reads the whole table on the public API, so it is off unless
+# explicitly enabled, and capped to fit one synchronous response
+EXPORT_ENABLED = os.environ.get('EXPORT_ENABLED', 'false').lower() == 'true'
+EXPORT_MAX_ITEMS = int(os.environ.get('EXPORT_MAX_ITEMS', '10000'))
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+MAX_SCAN_SEGMENTS = 16
+EXPORT_MAX_BYTES = 5 * 1024 * 1024  # headroom under Lambda's 6 MB response limit
+MAX_BATCH_ITEMS = 500
+BATCH_WRITE_SIZE = 25  # DynamoDB BatchWriteItem limit
+BATCH_MAX_ATTEMPTS = 5
+BATCH_BACKOFF_BASE = 0.05  # seconds
+SQS_MAX_CONCURRENCY = int(os.environ.get('SQS_MAX_CONCURRENCY', '4'))
+
+# Namespace for deriving todo ids from SQS message ids, so a redelivered
+# message overwrites the todo it already created instead of duplicating it
+SQS_TODO_NAMESPACE = uuid.UUID('6f1d7c52-3a7e-4d53-9a3c-1f0f8b6c2e41')
+
+# Fields PATCH /todos/{id} may change, with their validators
+UPDATABLE_FIELDS = {
+    'title': lambda value: isinstance(value, str) and bool(value),
+    'completed': lambda value: isinstance(value, bool),
+}
+
+_store = None
+
+def get_store():
+    """Create the storage backend on first use and reuse it while the container is warm"""
+    global _store
+    if _store is None:
+        _store = storage.create_store(STORAGE_BACKEND, TABLE_NAME,
+                                      endpoint_url=DYNAMODB_ENDPOINT, sqlite_path=SQLITE_PATH,
+                                      completed_index=COMPLETED_INDEX, open_index=OPEN_INDEX)
+    return _store
+
+class ReadCache:
+    """TTL + LRU cache of serialized GET responses, kept across warm invocations.
+
+    Memory is bounded by both entry count and the total size of the cached
+    bodies, including the compressed copies kept per content encoding so a
+    hit is not compressed again. Each entry remembers the table version it was read at; when the
+    version moves (a write from this or any other container), the whole
+    cache is dropped.
+    """
+
+    def __init__(self, max_entries, max_bytes, ttl):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.version = None
+        self.version_checked_at = float('-inf')
+        self.cleared_at = float('-inf')
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires_at, payload, etag, {encoding: body})
+        self._bytes = 0
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1:3]
+        if entry is not None:
+            self._discard(key)
+        self.misses += 1
+        return None
+
+    def set(self, key, payload, etag):
+        if self.max_entries <= 0 or len(payload) > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = (time.monotonic() + self.ttl, payload, etag, {})
+        self._bytes += len(payload)
+        self._evict()
+
+    def get_encoded(self, key, encoding):
+        entry = self._entries.get(key)
+        return entry[3].get(encoding) if entry is not None else None
+
+    def set_encoded(self, key, encoding, body):
+        """Keep a compressed copy of a cached body; ignored if the entry is gone"""
+        entry = self._entries.get(key)
+        if entry is None or encoding in entry[3]:
+            return
+        entry[3][encoding] = body
+        self._bytes += len(body)
+        self._evict()
+
+    def clear(self, version=None):
+        self._entries.clear()
+        self._bytes = 0
+        self.version = version
+        self.cleared_at = time.monotonic()
+
+    def stats(self):
+        return (f'hits={self.hits}; misses={self.misses}; entries={len(self._entries)}; '
+                f'bytes={self._bytes}; version={self.version}')
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1]) + sum(len(body) for body in entry[3].values())
+
+read_cache = ReadCache(CACHE_MAX_ENTRIES, CACHE_MAX_BYTES, CACHE_TTL_SECONDS)
+
+def sync_cache_version():
+    """Drop cached reads if another container has written since we last looked"""
+    now = time.monotonic()
+    if now - read_cache.version_checked_at < CACHE_VERSION_CHECK_SECONDS:
+        return
+    version = get_store().get_version()
+    if version != read_cache.version:
+        read_cache.clear(version)
+    read_cache.version_checked_at = now
+
+def invalidate_cache():
+    """Record a write: drop this container's cache and bump the shared version.
+
+    The bump is a second write that is not atomic with the todo write and
+    hits one hot item, so it can throttle or fail. The todo is already
+    stored by then, so a failure is logged rather than turned into a 500
+    (which would make clients retry and create duplicates); other
+    containers then notice the write within CACHE_TTL_SECONDS.
+    """
+    read_cache.clear()
+    try:
+        version = get_store().bump_version()
+    except Exception as e:
+        print(f'Could not bump the cache version: {e}')
+        return
+    read_cache.version = version
+    read_cache.version_checked_at = time.monotonic()
+
+def cached_response(key, load, settle_seconds=0):
+    """Serve a GET from the read cache, calling load() for the body on a miss.
+
+    The cached ETag lets finalize_response answer If-None-Match with a 304
+    without serializing or hashing the body again. load() must read
+    consistently; for eventually consistent reads pass settle_seconds, and
+    results read that soon after a write are served but not cached (they
+    could predate the write yet be stored under the new version).
+    """
+    sync_cache_version()
+    cached = read_cache.get(key)
+    status = 'HIT'
+    if cached is None:
+        status = 'MISS'
+        payload = json_dumps(load())
+        cached = (payload, compute_etag(payload))
+        if time.monotonic() - read_cache.cleared_at >= settle_seconds:
+            read_cache.set(key, *cached)
+    payload, etag = cached
+    result = build_response(200, payload, {
+        'ETag': etag,
+        'X-Cache': status,
+        'X-Cache-Stats': read_cache.stats()
+    })
+    # Lets finalize_response reuse and store compressed copies; it removes the
+    # key, since API Gateway rejects unknown fields in a proxy response
+    result['cacheKey'] = key
+    return result
+
+class RouteNode:
+    """One path segment in the compiled route tree"""
+
+    def __init__(self):
+        self.static = {}      # literal segment -> RouteNode
+        self.param = None     # (name, RouteNode) for a {placeholder} segment
+        self.handlers = {}    # HTTP method -> handler(event, path_params)
+
+def compile_routes(routes):
+    """Build a segment tree from (method, template, handler) tuples.
+
+    Dispatch walks one dict lookup per path segment, so its cost depends on
+    the depth of the path rather than on how many routes are registered.
+    Literal segments win over placeholders (/todos/batch before /todos/{id}).
+    """
+    root = RouteNode()
+    for method, template, handler in routes:
+        node = root
+        for segment in template.strip('/').split('/'):
+            if segment.startswith('{') and segment.endswith('}'):
+                if node.param is None:
+                    node.param = (segment[1:-1], RouteNode())
+                node = node.param[1]
+            else:
+                node = node.static.setdefault(segment, RouteNode())
+        node.handlers[method] = handler
+    return root
+
+def match_route(root, path):
+    """Return (node, path_params) for a request path, or (None, None)"""
+    node = root
+    path_params = {}
+    for segment in path.strip('/').split('/'):
+        child = node.static.get(segment)
+        if child is None and node.param is not None and segment:
+            name, child = node.param
+            path_params[name] = segment
+        if child is None:
+            return None, None
+        node = child
+    return node, path_params
 
 def lambda_handler(event, context):
-    http_method = event['httpMethod']
-    path = event['path']
-    
+    if is_sqs_event(event):
+        return handle_sqs_batch(event)
+    return finalize_response(event, handle_request(event))
+
+def handle_request(event):
+    node, path_params = match_route(ROUTE_TREE, event['path'])
+    if node is None or not node.handlers:
+        return response(404, {'error': 'Not found'})
+    handler = node.handlers.get(event['httpMethod'])
+    if handler is None:
+        return response(405, {'error': 'Method not allowed'}, {'Allow': ', '.join(sorted(node.handlers))})
+
     try:
-        if http_method == 'GET' and path == '/todos':
-            return get_todos()
-        elif http_method == 'POST' and path == '/todos':
-            return create_todo(json.loads(event['body']))
-        elif http_method == 'DELETE' and '/todos/' in path:
-            todo_id = path.split('/')[-1]
-            return delete_todo(todo_id)
-        else:
-            return response(400, {'error': 'Invalid request'})
+        return handler(event, path_params)
+    except storage.TodoNotFound:
+        return response(404, {'error': 'Todo not found'})
+    except ValueError as e:
+        return response(400, {'error': str(e)})
     except Exception as e:
         return response(500, {'error': str(e)})
 
-def get_todos():
-    result = table.scan()
-    return response(200, {'todos': result['Items']})
+def query_params(event):
+    return event.get('queryStringParameters') or {}
+
+def json_body(event):
+    body = event.get('body') or '{}'
+    # With a Binary Media Type such as */* (needed for compressed responses),
+    # API Gateway passes request bodies base64-encoded
+    if event.get('isBase64Encoded'):
+        body = base64.b64decode(body)
+    return json.loads(body)
+
+def list_todos(params):
+    if params.get('mode') == 'export':
+        return export_todos(params)
+    return get_todos(params)
+
+def get_todos(params):
+    """Return a single page of todos plus an opaque cursor for the next one.
+
+    With ?completed=true|false the page comes from a query on a secondary
+    index, sorted by createdAt (newest first unless ?order=asc), so the read
+    cost follows the size of the result rather than the size of the table.
+    """
+    limit = parse_limit(params.get('limit'))
+    cursor = params.get('cursor') or ''
+    start_key = decode_cursor(cursor) if cursor else None
+    completed = parse_bool(params.get('completed'), 'completed')
+    order = params.get('order') or 'desc'
+    if order not in ('asc', 'desc'):
+        raise ValueError('order must be asc or desc')
+    # A cursor only resumes the listing mode that produced it
+    if start_key is not None and set(start_key) != get_store().cursor_keys(completed):
+        raise ValueError('Invalid cursor')
+
+    def load():
+        if completed is None:
+            items, last_key = get_store().scan_page(limit, start_key)
+        else:
+            items, last_key = get_store().query_by_completed(
+                completed, limit, start_key, newest_first=(order == 'desc'))
+        return {'todos': items, 'nextCursor': encode_cursor(last_key)}
+
+    return cached_response(f'list:{limit}:{completed}:{order}:{cursor}', load,
+                           settle_seconds=0 if completed is None else CACHE_INDEX_SETTLE_SECONDS)
+
+def export_todos(params):
+    """Read the whole table with a parallel segmented scan (for exports only).
+
+    The result has to fit in one Lambda response (6 MB) and finish inside
+    API Gateway's 29 s timeout, so exports larger than EXPORT_MAX_ITEMS or
+    EXPORT_MAX_BYTES are refused with 413; page through GET /todos instead.
+    """
+    if not EXPORT_ENABLED:
+        return response(403, {'error': 'Export is disabled'})
+    segments = parse_int(params.get('segments'), 'segments', default=4)
+    if not 1 <= segments <= MAX_SCAN_SEGMENTS:
+        raise ValueError(f'segments must be between 1 and {MAX_SCAN_SEGMENTS}')
+    # Imported here: concurrent.futures pulls in logging, which cold starts don't need
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=segments) as pool:
+        store = get_store()
+        # One item over the cap per segment is enough to tell that the table is too big
+        pages = pool.map(lambda segment: store.scan_segment(segment, segments, EXPORT_MAX_ITEMS + 1),
+                         range(segments))
+        items = [item for page in pages for item in page]
+    too_large = {'error': f'Export exceeds the limit of {EXPORT_MAX_ITEMS} items or '
+                          f'{EXPORT_MAX_BYTES // (1024 * 1024)} MB; page through GET /todos instead'}
+    if len(items) > EXPORT_MAX_ITEMS:
+        return response(413, too_large)
+    payload = json_dumps({'todos': items, 'count': len(items)})
+    if len(payload.encode()) > EXPORT_MAX_BYTES:
+        return response(413, too_large)
+    return build_response(200, payload)
+
+def get_todo(todo_id):
+    check_todo_id(todo_id)
+
+    def load():
+        item = get_store().get(todo_id)
+        if item is None:
+            raise storage.TodoNotFound(todo_id)
+        return item
+
+    return cached_response(f'item:{todo_id}', load)
+
+def update_todo(todo_id, body):
+    """Change only the fields sent in the request; 404 if the todo does not exist"""
+    check_todo_id(todo_id)
+    if not isinstance(body, dict) or not body:
+        raise ValueError('Request body must be a non-empty object')
+    unknown = set(body) - UPDATABLE_FIELDS.keys()
+    if unknown:
+        raise ValueError(f'Cannot update field(s): {", ".join(sorted(unknown))}')
+    for name, value in body.items():
+        if not UPDATABLE_FIELDS[name](value):
+            raise ValueError(f'Invalid value for {name}')
+    item = get_store().update(todo_id, body)
+    invalidate_cache()
+    return response(200, item)
+
+def check_todo_id(todo_id):
+    # The table-version bookkeeping item is not a todo
+    if todo_id == storage.VERSION_ITEM_ID:
+        raise storage.TodoNotFound(todo_id)
 
 def create_todo(body):
-    todo_id = str(uuid.uuid4())
-    item = {
-        'id': todo_id,
-        'title': body['title'],
-        'completed': False,
-        'createdAt': datetime.utcnow().isoformat()
-    }
-    table.put_item(Item=item)
+    title = valid_title(body)
+    if title is None:
+        raise ValueError('title is required')
+    item = new_todo(title)
+    get_store().put(item)
+    invalidate_cache()
     return response(201, item)
 
 def delete_todo(todo_id):
-    table.delete_item(Key={'id': todo_id})
+    check_todo_id(todo_id)
+    get_store().delete(todo_id)
+    invalidate_cache()
     return response(200, {'message': 'Todo deleted'})
 
-def response(status_code, body):
+def valid_title(entry):
+    """Return the title of a create request, or None unless it is an object
+    with a non-empty string title"""
+    title = entry.get('title') if isinstance(entry, dict) else None
+    return title if UPDATABLE_FIELDS['title'](title) else None
+
+def new_todo(title, todo_id=None, created_at=None):
+    return {
+        'id': todo_id or str(uuid.uuid4()),
+        'title': title,
+        'completed': False,
+        'createdAt': (created_at or datetime.utcnow()).isoformat()
+    }
+
+def create_todos_batch(body):
+    """Create many todos in one request; the result reports each item separately"""
+    entries = batch_entries(body, 'todos')
+    results = []
+    pending = {}
+    for index, entry in enumerate(entries):
+        title = valid_title(entry)
+        if title is None:
+            results.append({'index': index, 'status': 'failed', 'error': 'title is required'})
+            continue
+        item = new_todo(title)
+        pending[item['id']] = item
+        results.append({'index': index, 'id': item['id'], 'status': 'created'})
+    failures = write_batches(get_store().batch_put, get_store().put, pending)
+    if pending:
+        invalidate_cache()
+    return batch_response(results, failures)
+
+def delete_todos_batch(body):
+    """Delete many todos in one request; the result reports each id separately"""
+    entries = batch_entries(body, 'ids')
+    results = []
+    pending = {}
+    for index, todo_id in enumerate(entries):
+        if not isinstance(todo_id, str) or not todo_id or todo_id == storage.VERSION_ITEM_ID:
+            results.append({'index': index, 'status': 'failed', 'error': 'id must be a non-empty string'})
+            continue
+        # BatchWriteItem rejects a batch that names the same key twice
+        pending[todo_id] = todo_id
+        results.append({'index': index, 'id': todo_id, 'status': 'deleted'})
+    failures = write_batches(get_store().batch_delete, get_store().delete, pending)
+    if pending:
+        invalidate_cache()
+    return batch_response(results, failures)
+
+def is_sqs_event(event):
+    records = event.get('Records')
+    return bool(records) and records[0].get('eventSource') == 'aws:sqs'
+
+def handle_sqs_batch(event):
+    """Drain one SQS batch of todo messages with partial-failure reporting.
+
+    Message bodies are {"title": ...} to create a todo or
+    {"action": "delete", "id": ...} to delete one. Writes from the whole batch
+    are coalesced into 25-item BatchWriteItem chunks that run concurrently
+    (at most SQS_MAX_CONCURRENCY at a time). Only the messages whose write
+    failed are returned in batchItemFailures, so SQS redelivers just those;
+    this needs ReportBatchItemFailures enabled on the event source mapping.
+    """
+    failed_messages = []
+    puts = {}
+    deletes = {}
+    owners = {}  # todo id -> message ids that asked for the write
+    for record in event['Records']:
+        message_id = record['messageId']
+        try:
+            kind, todo_id, payload = parse_sqs_message(record)
+        except ValueError:
+            failed_messages.append(message_id)
+            continue
+        (puts if kind == 'create' else deletes)[todo_id] = payload
+        owners.setdefault(todo_id, []).append(message_id)
+
+    store = get_store()
+    chunks = [(store.batch_put, store.put, chunk) for chunk in split_pending(puts)]
+    chunks += [(store.batch_delete, store.delete, chunk) for chunk in split_pending(deletes)]
+    failures = {}
+    if len(chunks) > 1 and SQS_MAX_CONCURRENCY > 1:
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=min(SQS_MAX_CONCURRENCY, len(chunks))) as pool:
+            for result in pool.map(lambda job: write_batches(*job), chunks):
+                failures.update(result)
+    else:
+        for write, write_one, chunk in chunks:
+            failures.update(write_batches(write, write_one, chunk))
+
+    for todo_id in failures:
+        failed_messages.extend(owners[todo_id])
+    if len(failures) < len(puts) + len(deletes):
+        invalidate_cache()
+    return {'batchItemFailures': [{'itemIdentifier': m} for m in failed_messages]}
+
+def parse_sqs_message(record):
+    """Return (kind, todo_id, write payload) for one SQS record"""
+    body = json.loads(record['body'])
+    if not isinstance(body, dict):
+        raise ValueError('Message body must be an object')
+    action = body.get('action', 'create')
+    if action == 'create':
+        title = valid_title(body)
+        if title is None:
+            raise ValueError('title is required')
+        # Id and createdAt both come from the message, so a redelivery writes
+        # the same item rather than a newer copy of it
+        todo_id = str(uuid.uuid5(SQS_TODO_NAMESPACE, record['messageId']))
+        sent = record.get('attributes', {}).get('SentTimestamp')
+        created_at = datetime.utcfromtimestamp(int(sent) / 1000) if sent else None
+        return 'create', todo_id, new_todo(title, todo_id, created_at)
+    if action == 'delete':
+        todo_id = body.get('id')
+        if not isinstance(todo_id, str) or not todo_id or todo_id == storage.VERSION_ITEM_ID:
+            raise ValueError('id must be a non-empty string')
+        return 'delete', todo_id, todo_id
+    raise ValueError(f'Unknown action: {action}')
+
+def split_pending(pending):
+    ids = list(pending)
+    return [{todo_id: pending[todo_id] for todo_id in ids[start:start + BATCH_WRITE_SIZE]}
+            for start in range(0, len(ids), BATCH_WRITE_SIZE)]
+
+def batch_entries(body, field):
+    entries = body.get(field) if isinstance(body, dict) else None
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f'{field} must be a non-empty list')
+    if len(entries) > MAX_BATCH_ITEMS:
+        raise ValueError(f'A batch may contain at most {MAX_BATCH_ITEMS} {field}')
+    return entries
+
+def write_batches(write, write_one, pending):
+    """Send pending writes in BatchWriteItem-sized chunks, retrying unprocessed ones.
+
+    `pending` maps todo id -> the payload `write` expects; `write` returns the
+    ids the backend left unprocessed. If a chunk is rejected because of an
+    invalid item (one item over DynamoDB's 400 KB limit fails the entire
+    call), its items are retried one by one with `write_one`, so only the bad
+    ones fail. Any other error (e.g. throttling) leaves the whole chunk to the
+    backoff loop. Returns a dict of id -> error message for every write that
+    did not succeed.
+    """
+    failures = {}
+    ids = list(pending)
+    for start in range(0, len(ids), BATCH_WRITE_SIZE):
+        chunk = ids[start:start + BATCH_WRITE_SIZE]
+        error = 'Unprocessed after retries'
+        for attempt in range(BATCH_MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(backoff_delay(attempt))
+            try:
+                chunk = write([pending[todo_id] for todo_id in chunk])
+            except storage.BatchRejected:
+                failures.update(write_each(write_one, pending, chunk))
+                chunk = []
+            except Exception as e:
+                error = str(e)
+            if not chunk:
+                break
+        failures.update(dict.fromkeys(chunk, error))
+    return failures
+
+def write_each(write_one, pending, ids):
+    """Write items individually; return id -> error message for the ones that fail"""
+    failures = {}
+    for todo_id in ids:
+        try:
+            write_one(pending[todo_id])
+        except Exception as e:
+            failures[todo_id] = str(e)
+    return failures
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter"""
+    return random.uniform(0, BATCH_BACKOFF_BASE * 2 ** attempt)
+
+def batch_response(results, failures):
+    for result in results:
+        error = failures.get(result.get('id'))
+        if result['status'] != 'failed' and error:
+            result.update(status='failed', error=error)
+    failed = sum(1 for result in results if result['status'] == 'failed')
+    # 207 Multi-Status tells the client to inspect the per-item results
+    return response(207 if failed else 200, {
+        'results': results,
+        'succeeded': len(results) - failed,
+        'failed': failed
+    })
+
+def parse_int(value, name, default):
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an integer')
+
+def parse_bool(value, name):
+    if value in (None, ''):
+        return None
+    if value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    raise ValueError(f'{name} must be true or false')
+
+def parse_limit(value):
+    limit = parse_int(value, 'limit', default=DEFAULT_PAGE_SIZE)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return limit
+
+def encode_cursor(last_key):
+    """Turn DynamoDB's LastEvaluatedKey into an opaque, URL-safe token"""
+    if not last_key:
+        return None
+    raw = json.dumps(last_key, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(key, dict) or not isinstance(key.get('id'), str):
+        raise ValueError('Invalid cursor')
+    return key
+
+ROUTE_TREE = compile_routes([
+    ('GET', '/todos', lambda event, args: list_todos(query_params(event))),
+    ('POST', '/todos', lambda event, args: create_todo(json_body(event))),
+    ('POST', '/todos/batch', lambda event, args: create_todos_batch(json_body(event))),
+    ('DELETE', '/todos/batch', lambda event, args: delete_todos_batch(json_body(event))),
+    ('GET', '/todos/{id}', lambda event, args: get_todo(args['id'])),
+    ('PATCH', '/todos/{id}', lambda event, args: update_todo(args['id'], json_body(event))),
+    ('DELETE', '/todos/{id}', lambda event, args: delete_todo(args['id'])),
+])
+
+def json_dumps(body):
+    if orjson is not None:
+        return orjson.dumps(body).decode()
+    return json.dumps(body, separators=(',', ':'))
+
+def compute_etag(payload):
+    # Weak: the same JSON is served gzip-, brotli- or un-encoded
+    return 'W/"' + hashlib.blake2b(payload.encode(), digest_size=16).hexdigest() + '"'
+
+def response(status_code, body, headers=None):
+    return build_response(status_code, json_dumps(body), headers)
+
+def build_response(status_code, payload, headers=None):
     return {
         'statusCode': status_code,
         'headers': {
             'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*'
+            'Access-Control-Allow-Origin': '*',
+            **(headers or {})
         },
-        'body': json.dumps(body)
+        'body': payload
     }
+
+def finalize_response(event, result):
+    """Apply conditional-GET and content-encoding negotiation to a handler result"""
+    request_headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    headers = result['headers']
+    cache_key = result.pop('cacheKey', None)
+    payload = result['body'].encode()
+    compressible = len(payload) >= COMPRESSION_MIN_BYTES
+    if compressible:
+        headers['Vary'] = 'Accept-Encoding'
+    if event.get('httpMethod') == 'GET' and result['statusCode'] == 200:
+        etag = headers.setdefault('ETag', compute_etag(result['body']))
+        headers['Cache-Control'] = 'no-cache'
+        if etag_matches(request_headers.get('if-none-match'), etag):
+            not_modified = {k: headers[k] for k in ('ETag', 'Cache-Control', 'Access-Control-Allow-Origin', 'Vary')
+                            if k in headers}
+            return {'statusCode': 304, 'headers': not_modified, 'body': ''}
+
+    if not compressible:
+        return result
+    encoding = choose_encoding(request_headers.get('accept-encoding', ''))
+    if encoding is None:
+        return result
+    body = read_cache.get_encoded(cache_key, encoding) if cache_key else None
+    if body is None:
+        if encoding == 'br':
+            compressed = brotli.compress(payload, quality=5)
+        else:
+            compressed = gzip.compress(payload, compresslevel=6)
+        body = base64.b64encode(compressed).decode()
+        if cache_key:
+            read_cache.set_encoded(cache_key, encoding, body)
+    headers['Content-Encoding'] = encoding
+    result['body'] = body
+    result['isBase64Encoded'] = True
+    return result
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    # If-None-Match uses weak comparison, so W/"x" and "x" are the same tag
+    tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+    return etag.removeprefix('W/') in tags
+
+def choose_encoding(accept_encoding):
+    """Pick br or gzip from an Accept-Encoding header, honouring q=0"""
+    accepted = {}
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
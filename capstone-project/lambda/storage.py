@@ -0,0 +1,477 @@
+"""Storage backends for the todo Lambda.
+
+Every backend implements the same small interface (see TodoStore) so the
+handler can run against DynamoDB in AWS, or against an in-memory or SQLite
+store locally and in tests without any AWS credentials.
+"""
+import json
+import bisect
+import threading
+
+# Reserved item holding the table's write version. Every write bumps it, so
+# warm containers can tell their cached reads are stale with one cheap
+# GetItem instead of a scan.
+VERSION_ITEM_ID = '__version__'
+
+# Attributes that exist only to key the DynamoDB secondary indexes. They are
+# derived from `completed` on every write and never returned to clients.
+#   CompletedIndex: completedKey ('true' / 'false') + createdAt
+#   OpenTodosIndex: openKey + createdAt, set only while a todo is open, so the
+#                   index is sparse and holds nothing but open todos
+COMPLETED_KEY = 'completedKey'
+OPEN_KEY = 'openKey'
+OPEN_KEY_VALUE = 'open'
+
+class TodoNotFound(Exception):
+    """Raised when an update targets a todo that does not exist"""
+
+class BatchRejected(Exception):
+    """Raised when a batch write is refused outright because an item in it is
+    invalid (e.g. over DynamoDB's 400 KB item limit); the others may be fine"""
+
+class TodoStore:
+    """Interface every storage backend implements"""
+
+    def scan_page(self, limit, start_key=None):
+        """Return (items, last_key); last_key is None on the final page"""
+        raise NotImplementedError
+
+    def scan_segment(self, segment, total_segments, max_items=None):
+        """Return the items in one segment of a parallel scan, stopping after max_items"""
+        raise NotImplementedError
+
+    def get(self, todo_id):
+        """Return one item, or None when it does not exist"""
+        raise NotImplementedError
+
+    def put(self, item):
+        raise NotImplementedError
+
+    def update(self, todo_id, fields):
+        """Set only the given fields on an existing item and return the updated item.
+
+        Raises TodoNotFound instead of creating the item when it is missing.
+        """
+        raise NotImplementedError
+
+    def delete(self, todo_id):
+        raise NotImplementedError
+
+    def query_by_completed(self, completed, limit, start_key=None, newest_first=True):
+        """Return (items, last_key) for todos with the given completed flag, ordered by createdAt"""
+        raise NotImplementedError
+
+    def cursor_keys(self, completed=None):
+        """Keys of the last_key returned by scan_page (completed None) or query_by_completed"""
+        return {'id'} if completed is None else {'id', 'createdAt'}
+
+    def batch_put(self, items):
+        """Write up to 25 items; return the ids the backend left unprocessed.
+
+        Raises BatchRejected if the backend refuses the whole batch because of
+        an invalid item.
+        """
+        for item in items:
+            self.put(item)
+        return []
+
+    def batch_delete(self, todo_ids):
+        """Delete up to 25 items; return the ids the backend left unprocessed"""
+        for todo_id in todo_ids:
+            self.delete(todo_id)
+        return []
+
+    def get_version(self):
+        """Return the current write version of the table"""
+        raise NotImplementedError
+
+    def bump_version(self):
+        """Increment the write version and return the new value"""
+        raise NotImplementedError
+
+class DynamoDBStore(TodoStore):
+    """DynamoDB backend built on the low-level client.
+
+    The client is created on first use rather than at import time and is
+    reused for the lifetime of the container, so cold starts skip boto3
+    entirely until a request actually needs the table.
+    """
+
+    def __init__(self, table_name, endpoint_url=None,
+                 completed_index='CompletedIndex', open_index='OpenTodosIndex'):
+        self.table_name = table_name
+        self.endpoint_url = endpoint_url
+        self.completed_index = completed_index
+        self.open_index = open_index
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import boto3
+                    self._client = boto3.client('dynamodb', endpoint_url=self.endpoint_url)
+        return self._client
+
+    def scan_page(self, limit, start_key=None):
+        # Strongly consistent, like get(): the read cache keeps these results
+        # until the next write, so they must already include the last one
+        kwargs = {'TableName': self.table_name, 'Limit': limit, 'ConsistentRead': True}
+        if start_key:
+            kwargs['ExclusiveStartKey'] = serialize_item(start_key)
+        result = self.client.scan(**kwargs)
+        last_key = result.get('LastEvaluatedKey')
+        return (self._todo_items(result['Items']),
+                deserialize_item(last_key) if last_key else None)
+
+    def scan_segment(self, segment, total_segments, max_items=None):
+        items = []
+        kwargs = {'TableName': self.table_name, 'Segment': segment, 'TotalSegments': total_segments}
+        while True:
+            result = self.client.scan(**kwargs)
+            items.extend(self._todo_items(result['Items']))
+            if 'LastEvaluatedKey' not in result:
+                return items
+            if max_items is not None and len(items) >= max_items:
+                return items[:max_items]
+            kwargs['ExclusiveStartKey'] = result['LastEvaluatedKey']
+
+    def get(self, todo_id):
+        result = self.client.get_item(TableName=self.table_name, Key={'id': {'S': todo_id}},
+                                      ConsistentRead=True)
+        return self._from_dynamodb(result['Item']) if 'Item' in result else None
+
+    def put(self, item):
+        self.client.put_item(TableName=self.table_name, Item=self._to_dynamodb(item))
+
+    def update(self, todo_id, fields):
+        set_fields = dict(fields)
+        remove = ''
+        if 'completed' in fields:
+            set_fields[COMPLETED_KEY] = str(fields['completed']).lower()
+            if fields['completed']:
+                remove = f' REMOVE #f{len(set_fields)}'
+            else:
+                set_fields[OPEN_KEY] = OPEN_KEY_VALUE
+        names = {f'#f{i}': name for i, name in enumerate(set_fields)}
+        if remove:
+            names[f'#f{len(set_fields)}'] = OPEN_KEY
+        values = {f':v{i}': serialize_value(value) for i, value in enumerate(set_fields.values())}
+        assignments = ', '.join(f'#f{i} = :v{i}' for i in range(len(set_fields)))
+        try:
+            result = self.client.update_item(
+                TableName=self.table_name, Key={'id': {'S': todo_id}},
+                UpdateExpression=f'SET {assignments}{remove}',
+                ConditionExpression='attribute_exists(id)',
+                ExpressionAttributeNames=names, ExpressionAttributeValues=values,
+                ReturnValues='ALL_NEW')
+        except self.client.exceptions.ConditionalCheckFailedException:
+            raise TodoNotFound(todo_id)
+        return self._from_dynamodb(result['Attributes'])
+
+    def delete(self, todo_id):
+        self.client.delete_item(TableName=self.table_name, Key={'id': {'S': todo_id}})
+
+    def batch_put(self, items):
+        requests = [{'PutRequest': {'Item': self._to_dynamodb(item)}} for item in items]
+        unprocessed = self._batch_write(requests)
+        return [r['PutRequest']['Item']['id']['S'] for r in unprocessed]
+
+    def query_by_completed(self, completed, limit, start_key=None, newest_first=True):
+        if completed:
+            index, key_name, key_value = self.completed_index, COMPLETED_KEY, 'true'
+        else:
+            index, key_name, key_value = self.open_index, OPEN_KEY, OPEN_KEY_VALUE
+        kwargs = {
+            'TableName': self.table_name,
+            'IndexName': index,
+            'KeyConditionExpression': '#k = :k',
+            'ExpressionAttributeNames': {'#k': key_name},
+            'ExpressionAttributeValues': {':k': {'S': key_value}},
+            'ScanIndexForward': not newest_first,
+            'Limit': limit,
+        }
+        if start_key:
+            kwargs['ExclusiveStartKey'] = serialize_item(start_key)
+        result = self.client.query(**kwargs)
+        last_key = result.get('LastEvaluatedKey')
+        return (self._todo_items(result['Items']),
+                deserialize_item(last_key) if last_key else None)
+
+    def cursor_keys(self, completed=None):
+        # Query pages on an index are keyed by the index key as well as the table key
+        if completed is None:
+            return {'id'}
+        return {'id', 'createdAt', COMPLETED_KEY if completed else OPEN_KEY}
+
+    def batch_delete(self, todo_ids):
+        requests = [{'DeleteRequest': {'Key': {'id': {'S': todo_id}}}} for todo_id in todo_ids]
+        unprocessed = self._batch_write(requests)
+        return [r['DeleteRequest']['Key']['id']['S'] for r in unprocessed]
+
+    def _batch_write(self, requests):
+        try:
+            result = self.client.batch_write_item(RequestItems={self.table_name: requests})
+        except self.client.exceptions.ClientError as e:
+            # One invalid item fails the whole call with a ValidationException;
+            # throttling and other errors are raised as they are
+            if e.response['Error']['Code'] == 'ValidationException':
+                raise BatchRejected(str(e)) from e
+            raise
+        return result.get('UnprocessedItems', {}).get(self.table_name, [])
+
+    def get_version(self):
+        result = self.client.get_item(
+            TableName=self.table_name, Key={'id': {'S': VERSION_ITEM_ID}},
+            ProjectionExpression='#v', ExpressionAttributeNames={'#v': 'version'},
+            ConsistentRead=True)
+        return int(result.get('Item', {}).get('version', {}).get('N', 0))
+
+    def bump_version(self):
+        result = self.client.update_item(
+            TableName=self.table_name, Key={'id': {'S': VERSION_ITEM_ID}},
+            UpdateExpression='ADD #v :one', ExpressionAttributeNames={'#v': 'version'},
+            ExpressionAttributeValues={':one': {'N': '1'}}, ReturnValues='UPDATED_NEW')
+        return int(result['Attributes']['version']['N'])
+
+    @classmethod
+    def _todo_items(cls, raw_items):
+        return [cls._from_dynamodb(i) for i in raw_items if i['id']['S'] != VERSION_ITEM_ID]
+
+    @staticmethod
+    def _to_dynamodb(item):
+        raw = serialize_item(item)
+        completed = bool(item.get('completed'))
+        raw[COMPLETED_KEY] = {'S': str(completed).lower()}
+        if not completed:
+            raw[OPEN_KEY] = {'S': OPEN_KEY_VALUE}
+        return raw
+
+    @staticmethod
+    def _from_dynamodb(raw):
+        return {k: deserialize_value(v) for k, v in raw.items() if k not in (COMPLETED_KEY, OPEN_KEY)}
+
+class MemoryStore(TodoStore):
+    """In-process dict backend; data lives as long as the container does"""
+
+    def __init__(self):
+        self._items = {}
+        self._ids = []  # kept sorted so pages can resume with bisect
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def scan_page(self, limit, start_key=None):
+        with self._lock:
+            start = bisect.bisect_right(self._ids, start_key['id']) if start_key else 0
+            page_ids = self._ids[start:start + limit]
+            items = [dict(self._items[i]) for i in page_ids]
+            more = start + limit < len(self._ids)
+        return items, ({'id': page_ids[-1]} if more else None)
+
+    def scan_segment(self, segment, total_segments, max_items=None):
+        with self._lock:
+            ids = self._ids[segment::total_segments][:max_items]
+            return [dict(self._items[i]) for i in ids]
+
+    def get(self, todo_id):
+        item = self._items.get(todo_id)
+        return dict(item) if item is not None else None
+
+    def put(self, item):
+        with self._lock:
+            if item['id'] not in self._items:
+                bisect.insort(self._ids, item['id'])
+            self._items[item['id']] = dict(item)
+
+    def update(self, todo_id, fields):
+        with self._lock:
+            item = self._items.get(todo_id)
+            if item is None:
+                raise TodoNotFound(todo_id)
+            item.update(fields)
+            return dict(item)
+
+    def delete(self, todo_id):
+        with self._lock:
+            if self._items.pop(todo_id, None) is not None:
+                del self._ids[bisect.bisect_left(self._ids, todo_id)]
+
+    def query_by_completed(self, completed, limit, start_key=None, newest_first=True):
+        with self._lock:
+            matches = sorted(((item['createdAt'], item['id']) for item in self._items.values()
+                              if bool(item.get('completed')) == completed), reverse=newest_first)
+            if start_key:
+                position = (start_key['createdAt'], start_key['id'])
+                matches = [m for m in matches if (m < position if newest_first else m > position)]
+            page = matches[:limit]
+            items = [dict(self._items[todo_id]) for _, todo_id in page]
+        more = len(matches) > limit
+        return items, ({'id': page[-1][1], 'createdAt': page[-1][0]} if more else None)
+
+    def get_version(self):
+        return self._version
+
+    def bump_version(self):
+        with self._lock:
+            self._version += 1
+            return self._version
+
+class SQLiteStore(TodoStore):
+    """SQLite backend; items are stored as JSON documents keyed by id"""
+
+    def __init__(self, table_name, path=':memory:'):
+        if not table_name.replace('_', '').isalnum():
+            raise RuntimeError(f'Invalid table name: {table_name}')
+        self.table_name = table_name
+        self._lock = threading.Lock()
+        import sqlite3
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {table_name} (id TEXT PRIMARY KEY, data TEXT NOT NULL)')
+            self._conn.execute(
+                f'CREATE TABLE IF NOT EXISTS {table_name}_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+            # Local counterpart of the DynamoDB CompletedIndex
+            self._conn.execute(
+                f'CREATE INDEX IF NOT EXISTS {table_name}_completed_created ON {table_name} '
+                f"(json_extract(data, '$.completed'), json_extract(data, '$.createdAt'), id)")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _execute(self, sql, params=()):
+        with self._lock, self._conn:
+            self._conn.execute(sql, params)
+
+    def scan_page(self, limit, start_key=None):
+        rows = self._query(
+            f'SELECT id, data FROM {self.table_name} WHERE id > ? ORDER BY id LIMIT ?',
+            (start_key['id'] if start_key else '', limit + 1))
+        items = [json.loads(data) for _, data in rows[:limit]]
+        more = len(rows) > limit
+        return items, ({'id': rows[limit - 1][0]} if more else None)
+
+    def scan_segment(self, segment, total_segments, max_items=None):
+        rows = self._query(
+            f'SELECT data FROM {self.table_name} WHERE rowid % ? = ? LIMIT ?',
+            (total_segments, segment, -1 if max_items is None else max_items))
+        return [json.loads(data) for data, in rows]
+
+    def get(self, todo_id):
+        rows = self._query(f'SELECT data FROM {self.table_name} WHERE id = ?', (todo_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def put(self, item):
+        self._execute(
+            f'INSERT OR REPLACE INTO {self.table_name} (id, data) VALUES (?, ?)',
+            (item['id'], json.dumps(item)))
+
+    def query_by_completed(self, completed, limit, start_key=None, newest_first=True):
+        direction, compare = ('DESC', '<') if newest_first else ('ASC', '>')
+        sql = (f"SELECT id, data, json_extract(data, '$.createdAt') FROM {self.table_name} "
+               f"WHERE json_extract(data, '$.completed') = ?")
+        params = [int(completed)]
+        if start_key:
+            sql += f" AND (json_extract(data, '$.createdAt'), id) {compare} (?, ?)"
+            params += [start_key['createdAt'], start_key['id']]
+        sql += f" ORDER BY json_extract(data, '$.createdAt') {direction}, id {direction} LIMIT ?"
+        rows = self._query(sql, params + [limit + 1])
+        items = [json.loads(data) for _, data, _ in rows[:limit]]
+        more = len(rows) > limit
+        return items, ({'id': rows[limit - 1][0], 'createdAt': rows[limit - 1][2]} if more else None)
+
+    def update(self, todo_id, fields):
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f'SELECT data FROM {self.table_name} WHERE id = ?', (todo_id,)).fetchone()
+            if row is None:
+                raise TodoNotFound(todo_id)
+            item = {**json.loads(row[0]), **fields}
+            self._conn.execute(
+                f'UPDATE {self.table_name} SET data = ? WHERE id = ?', (json.dumps(item), todo_id))
+        return item
+
+    def delete(self, todo_id):
+        self._execute(f'DELETE FROM {self.table_name} WHERE id = ?', (todo_id,))
+
+    def batch_put(self, items):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f'INSERT OR REPLACE INTO {self.table_name} (id, data) VALUES (?, ?)',
+                [(item['id'], json.dumps(item)) for item in items])
+        return []
+
+    def batch_delete(self, todo_ids):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f'DELETE FROM {self.table_name} WHERE id = ?', [(todo_id,) for todo_id in todo_ids])
+        return []
+
+    def get_version(self):
+        rows = self._query(f"SELECT value FROM {self.table_name}_meta WHERE name = 'version'")
+        return rows[0][0] if rows else 0
+
+    def bump_version(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO {self.table_name}_meta (name, value) VALUES ('version', 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1")
+            return self._conn.execute(
+                f"SELECT value FROM {self.table_name}_meta WHERE name = 'version'").fetchone()[0]
+
+BACKENDS = ('dynamodb', 'memory', 'sqlite')
+
+def create_store(backend, table_name, endpoint_url=None, sqlite_path=':memory:',
+                 completed_index='CompletedIndex', open_index='OpenTodosIndex'):
+    if backend == 'dynamodb':
+        return DynamoDBStore(table_name, endpoint_url=endpoint_url,
+                             completed_index=completed_index, open_index=open_index)
+    if backend == 'memory':
+        return MemoryStore()
+    if backend == 'sqlite':
+        return SQLiteStore(table_name, path=sqlite_path)
+    raise RuntimeError(f'Unknown storage backend: {backend} (expected one of {", ".join(BACKENDS)})')
+
+# DynamoDB attribute-value marshalling. The todo schema only uses strings,
+# numbers, booleans, null, lists and maps, so a small hand-rolled converter
+# keeps us off boto3's resource layer and its Decimal round-tripping.
+
+def serialize_value(value):
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, (int, float)):
+        return {'N': str(value)}
+    if isinstance(value, dict):
+        return {'M': serialize_item(value)}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize_value(v) for v in value]}
+    raise TypeError(f'Unsupported type for DynamoDB: {type(value).__name__}')
+
+def deserialize_value(attr):
+    (kind, value), = attr.items()
+    if kind == 'S':
+        return value
+    if kind == 'N':
+        return int(value) if value.lstrip('-').isdigit() else float(value)
+    if kind == 'BOOL':
+        return value
+    if kind == 'NULL':
+        return None
+    if kind == 'M':
+        return deserialize_item(value)
+    if kind == 'L':
+        return [deserialize_value(v) for v in value]
+    raise TypeError(f'Unsupported DynamoDB type: {kind}')
+
+def serialize_item(item):
+    return {k: serialize_value(v) for k, v in item.items()}
+
+def deserialize_item(item):
+    return {k: deserialize_value(v) for k, v in item.items()}
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""Replay synthetic API Gateway events against the Lambda handlers in-process.
+
+Builds a reproducible mix of GET / POST / DELETE events, pre-fills a local
+storage backend (no AWS needed) and replays the events directly against
+lambda_handler. Reports cold-start latency (fresh interpreter), warm
+latency percentiles, per-request allocation peaks (tracemalloc) and
+throughput, and saves the results as JSON so runs can be compared between
+commits.
+
+Targets:
+    todo   capstone-project/lambda/index.py
+    hello  AWS-training/dec-1/lambdacode.py
+
+Usage:
+    python tools/bench_handlers.py todo --requests 5000 --table-size 2000
+    python tools/bench_handlers.py todo --get 0.9 --post 0.05 --delete 0.05 --backend sqlite
+    python tools/bench_handlers.py hello
+    python tools/bench_handlers.py todo --compare bench-results/todo-abc1234.json
+"""
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(TOOLS_DIR)
+REPO_DIR = os.path.dirname(PROJECT_DIR)
+
+TARGETS = {
+    'todo': os.path.join(PROJECT_DIR, 'lambda', 'index.py'),
+    'hello': os.path.join(REPO_DIR, 'AWS-training', 'dec-1', 'lambdacode.py'),
+}
+
+COLD_START_PROBE = """
+import importlib.util, json, sys, time
+path, event = sys.argv[1], json.loads(sys.argv[2])
+start = time.perf_counter()
+spec = importlib.util.spec_from_file_location('handler_under_test', path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+imported = time.perf_counter()
+module.lambda_handler(event, None)
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'first_invoke_ms': (done - imported) * 1000}))
+"""
+
+def api_event(method, path, body=None, params=None):
+    return {
+        'httpMethod': method,
+        'path': path,
+        'headers': {'Accept-Encoding': 'gzip', 'Content-Type': 'application/json'},
+        'queryStringParameters': params,
+        'body': json.dumps(body) if body is not None else None,
+    }
+
+def build_todo_events(count, ratios, existing_ids, rng):
+    """Generate a replayable mix of todo API events.
+
+    GETs are split between plain listings, filtered listings and single-item
+    reads; DELETEs target pre-filled ids (each at most once) and fall back to
+    a GET when none are left.
+    """
+    methods = list(ratios)
+    weights = [ratios[m] for m in methods]
+    deletable = list(existing_ids)
+    rng.shuffle(deletable)
+    events = []
+    for i in range(count):
+        method = rng.choices(methods, weights)[0]
+        if method == 'DELETE' and deletable:
+            events.append(api_event('DELETE', f'/todos/{deletable.pop()}'))
+        elif method == 'POST':
+            events.append(api_event('POST', '/todos', {'title': f'Benchmark todo {i}'}))
+        else:
+            kind = rng.random()
+            if kind < 0.4:
+                events.append(api_event('GET', '/todos', params={'limit': '50'}))
+            elif kind < 0.7:
+                events.append(api_event('GET', '/todos', params={'completed': 'false', 'limit': '50'}))
+            elif existing_ids:
+                events.append(api_event('GET', f'/todos/{rng.choice(existing_ids)}'))
+            else:
+                events.append(api_event('GET', '/todos'))
+    return events
+
+def build_hello_events(count):
+    return [api_event('GET', '/hello') for _ in range(count)]
+
+def load_handler(target, env):
+    """Import the handler module fresh, with env applied before module-level config runs"""
+    os.environ.update(env)
+    path = TARGETS[target]
+    module_dir = os.path.dirname(path)
+    if module_dir not in sys.path:
+        sys.path.insert(0, module_dir)
+    spec = importlib.util.spec_from_file_location(f'bench_{target}', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def prefill(module, table_size, rng):
+    """Load table_size todos through the handler's own store; return their ids"""
+    store = module.get_store()
+    ids = []
+    for i in range(table_size):
+        item = module.new_todo(f'Seed todo {i}')
+        item['completed'] = rng.random() < 0.3
+        store.put(item)
+        ids.append(item['id'])
+    return ids
+
+def measure_cold(target, env, event, runs):
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, '-c', COLD_START_PROBE, TARGETS[target], json.dumps(event)],
+            cwd=os.path.dirname(TARGETS[target]), env=dict(os.environ, **env),
+            capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout))
+    return {
+        'runs': runs,
+        'import_ms_median': statistics.median(s['import_ms'] for s in samples),
+        'first_invoke_ms_median': statistics.median(s['first_invoke_ms'] for s in samples),
+    }
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def replay(handler, events):
+    """Time every invocation; returns (latencies_ms, elapsed_s, status counts)"""
+    latencies = []
+    statuses = {}
+    gc.collect()
+    start = time.perf_counter()
+    for event in events:
+        t0 = time.perf_counter()
+        result = handler(event, None)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        statuses[result['statusCode']] = statuses.get(result['statusCode'], 0) + 1
+    return latencies, time.perf_counter() - start, statuses
+
+def replay_allocations(handler, events):
+    """Peak bytes allocated while serving each request, measured separately because tracing is slow"""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for event in events:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            handler(event, None)
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+def git_revision():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def prepare(args, env):
+    """Load a fresh handler with a seeded table and event list; returns (module, warmup, measured).
+
+    Each call starts from an identical store state and the same workload, so
+    passes that replay the events never see each other's writes.
+    """
+    rng = random.Random(args.seed)
+    module = load_handler(args.target, env)
+    if args.target == 'todo':
+        ids = prefill(module, args.table_size, rng)
+        ratios = {'GET': args.get, 'POST': args.post, 'DELETE': args.delete}
+        events = build_todo_events(args.requests + args.warmup, ratios, ids, rng)
+    else:
+        events = build_hello_events(args.requests + args.warmup)
+    return module, events[:args.warmup], events[args.warmup:]
+
+def run(args):
+    env = {}
+    if args.target == 'todo':
+        env = {'STORAGE_BACKEND': args.backend, 'SQLITE_PATH': ':memory:'}
+        if args.no_cache:
+            env['CACHE_MAX_ENTRIES'] = '0'
+    cold_event = api_event('GET', '/todos') if args.target == 'todo' else api_event('GET', '/hello')
+    cold = measure_cold(args.target, env, cold_event, args.cold_runs)
+
+    module, warmup, measured = prepare(args, env)
+    replay(module.lambda_handler, warmup)
+    latencies, elapsed, statuses = replay(module.lambda_handler, measured)
+    latencies.sort()
+
+    # Allocations are traced on a second, identically seeded handler: replaying
+    # the measured events on the first one would delete ids already gone, read
+    # todos that no longer exist and grow the table further
+    module, warmup, measured = prepare(args, env)
+    replay(module.lambda_handler, warmup)
+    allocations = replay_allocations(module.lambda_handler, measured[:args.alloc_sample])
+
+    return {
+        'target': args.target,
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'config': {
+            'requests': args.requests, 'warmup': args.warmup, 'seed': args.seed,
+            'table_size': args.table_size if args.target == 'todo' else None,
+            'mix': {'GET': args.get, 'POST': args.post, 'DELETE': args.delete} if args.target == 'todo' else None,
+            'backend': args.backend if args.target == 'todo' else None,
+            'cache': not args.no_cache,
+        },
+        'cold': cold,
+        'warm': {
+            'mean_ms': statistics.fmean(latencies),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': latencies[-1],
+            'throughput_rps': len(measured) / elapsed if elapsed else 0.0,
+            'status_codes': {str(k): v for k, v in sorted(statuses.items())},
+        },
+        'allocations': {
+            'sampled_requests': len(allocations),
+            'peak_bytes_mean': statistics.fmean(allocations) if allocations else 0.0,
+            'peak_bytes_p95': percentile(sorted(allocations), 95),
+        },
+    }
+
+def print_report(results, baseline=None):
+    rows = [
+        ('cold import (ms)', results['cold']['import_ms_median'], ('cold', 'import_ms_median')),
+        ('cold first invoke (ms)', results['cold']['first_invoke_ms_median'], ('cold', 'first_invoke_ms_median')),
+        ('warm p50 (ms)', results['warm']['p50_ms'], ('warm', 'p50_ms')),
+        ('warm p95 (ms)', results['warm']['p95_ms'], ('warm', 'p95_ms')),
+        ('warm p99 (ms)', results['warm']['p99_ms'], ('warm', 'p99_ms')),
+        ('throughput (req/s)', results['warm']['throughput_rps'], ('warm', 'throughput_rps')),
+        ('alloc peak/request (B)', results['allocations']['peak_bytes_mean'], ('allocations', 'peak_bytes_mean')),
+    ]
+    print(f"{results['target']} @ {results['revision']}  status codes: {results['warm']['status_codes']}")
+    for label, value, (section, key) in rows:
+        line = f'  {label:<26}{value:>12.3f}'
+        if baseline is not None:
+            old = baseline.get(section, {}).get(key)
+            if old:
+                line += f'   (baseline {old:.3f}, {(value - old) / old * 100:+.1f}%)'
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('target', choices=sorted(TARGETS))
+    parser.add_argument('--requests', type=int, default=2000, help='measured requests (default: 2000)')
+    parser.add_argument('--warmup', type=int, default=200, help='unmeasured warm-up requests (default: 200)')
+    parser.add_argument('--table-size', type=int, default=1000, help='todos pre-loaded before replay (default: 1000)')
+    parser.add_argument('--get', type=float, default=0.8, help='relative weight of GET events')
+    parser.add_argument('--post', type=float, default=0.15, help='relative weight of POST events')
+    parser.add_argument('--delete', type=float, default=0.05, help='relative weight of DELETE events')
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory',
+                        help='local storage stand-in for the todo handler')
+    parser.add_argument('--no-cache', action='store_true', help='disable the warm-container read cache')
+    parser.add_argument('--cold-runs', type=int, default=5, help='fresh interpreters for cold-start timing')
+    parser.add_argument('--alloc-sample', type=int, default=500, help='requests replayed under tracemalloc')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='results file (default: bench-results/<target>-<revision>.json)')
+    parser.add_argument('--compare', help='earlier results file to compare against')
+    args = parser.parse_args()
+
+    results = run(args)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    output = args.output or os.path.join(PROJECT_DIR, 'bench-results', f"{args.target}-{results['revision']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f'results written to {output}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""Check that importing the todo Lambda stays within a cold-start budget.
+
+Lambda runs module-level code once per cold start, so anything imported or
+created there (boto3 in particular) is paid for by the first request of
+every new container. This script imports lambda/index.py in a fresh
+interpreter several times, reports the median import time and fails when it
+exceeds the budget or when boto3 is loaded eagerly.
+
+Usage:
+    python tools/check_cold_start.py [--budget-ms 50] [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+LAMBDA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lambda')
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import index
+elapsed = time.perf_counter() - start
+print(json.dumps({'ms': elapsed * 1000, 'boto3': 'boto3' in sys.modules}))
+"""
+
+def measure_import(runs):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', PROBE], cwd=LAMBDA_DIR, env=env,
+                             capture_output=True, text=True, check=True)
+        samples.append(json.loads(out.stdout))
+    return samples
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=50.0,
+                        help='maximum median import time in milliseconds (default: 50)')
+    parser.add_argument('--runs', type=int, default=5, help='number of fresh interpreters to sample')
+    args = parser.parse_args()
+
+    samples = measure_import(args.runs)
+    median_ms = statistics.median(s['ms'] for s in samples)
+    eager_boto3 = any(s['boto3'] for s in samples)
+
+    print(f'import index: median {median_ms:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)')
+    if eager_boto3:
+        print('FAIL: boto3 is imported at module load; create clients lazily in storage.py')
+        return 1
+    if median_ms > args.budget_ms:
+        print('FAIL: cold-start import budget exceeded')
+        return 1
+    print('OK')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
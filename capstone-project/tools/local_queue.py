@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""In-process stand-in for an SQS queue feeding the todo Lambda.
+
+LocalQueue mimics what the SQS event source mapping does with a standard
+queue and ReportBatchItemFailures enabled: it delivers messages in batches,
+deletes the ones the handler did not report in batchItemFailures,
+redelivers the rest and moves a message to the dead-letter list after
+max_receive_count attempts.
+
+Run as a script to drain a queue of generated todos through
+lambda/index.py on a local storage backend and report throughput per
+batch size:
+
+    python tools/local_queue.py --messages 5000 --batch-sizes 1 10 100
+"""
+import argparse
+import collections
+import itertools
+import json
+import os
+import sys
+import time
+import uuid
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAMBDA_DIR = os.path.join(PROJECT_DIR, 'lambda')
+
+QUEUE_ARN = 'arn:aws:sqs:us-east-1:000000000000:todo-ingest'
+
+class LocalQueue:
+    def __init__(self, max_receive_count=3):
+        self.max_receive_count = max_receive_count
+        self.dead_letters = []
+        self._messages = collections.deque()  # [message_id, body, receive_count, sent_ms]
+        self._sequence = itertools.count()
+
+    def __len__(self):
+        return len(self._messages)
+
+    def send(self, body):
+        message_id = str(uuid.uuid4())
+        self._messages.append([message_id, json.dumps(body), 0, int(time.time() * 1000)])
+        return message_id
+
+    def receive_event(self, batch_size):
+        """Pop up to batch_size messages and wrap them in an SQS Lambda event"""
+        batch = [self._messages.popleft() for _ in range(min(batch_size, len(self._messages)))]
+        records = []
+        for message in batch:
+            message[2] += 1
+            records.append({
+                'messageId': message[0],
+                'receiptHandle': f'local-{next(self._sequence)}',
+                'body': message[1],
+                'attributes': {'ApproximateReceiveCount': str(message[2]), 'SentTimestamp': str(message[3])},
+                'messageAttributes': {},
+                'eventSource': 'aws:sqs',
+                'eventSourceARN': QUEUE_ARN,
+                'awsRegion': 'us-east-1',
+            })
+        return {'Records': records}, batch
+
+    def drain(self, handler, batch_size=10):
+        """Invoke handler until the queue is empty; returns the number of invocations"""
+        invocations = 0
+        while self._messages:
+            event, batch = self.receive_event(batch_size)
+            result = handler(event, None) or {}
+            invocations += 1
+            failed = {f['itemIdentifier'] for f in result.get('batchItemFailures', [])}
+            for message in batch:
+                if message[0] not in failed:
+                    continue
+                if message[2] >= self.max_receive_count:
+                    self.dead_letters.append(message)
+                else:
+                    self._messages.append(message)
+        return invocations
+
+def load_todo_handler(backend):
+    os.environ['STORAGE_BACKEND'] = backend
+    sys.path.insert(0, LAMBDA_DIR)
+    import index
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--invalid-every', type=int, default=0,
+                        help='make every Nth message malformed to exercise partial failures')
+    args = parser.parse_args()
+
+    index = load_todo_handler(args.backend)
+    for batch_size in args.batch_sizes:
+        queue = LocalQueue()
+        for i in range(args.messages):
+            invalid = args.invalid_every and i % args.invalid_every == 0
+            queue.send({} if invalid else {'title': f'Queued todo {i}'})
+        start = time.perf_counter()
+        invocations = queue.drain(index.lambda_handler, batch_size)
+        elapsed = time.perf_counter() - start
+        print(f'batch size {batch_size:>4}: {invocations:>6} invocations, '
+              f'{args.messages / elapsed:>10.0f} msg/s, '
+              f'{args.messages / invocations:>7.1f} msg/invocation, '
+              f'{len(queue.dead_letters)} dead-lettered')
+
+if __name__ == '__main__':
+    main()
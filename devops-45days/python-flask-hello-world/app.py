@@ -2,7 +2,10 @@
 
 from flask import Flask
 
+from metrics import init_metrics
+
 app = Flask(__name__)
+init_metrics(app)
 
 @app.route("/")
 def hello_world():
@@ -13,5 +16,6 @@ def hello_name(name):
     return f"Hello {name}!"
 
 if __name__ == "__main__":
+    # Development server only; production runs under gunicorn (see gunicorn.conf.py)
     app.run(host="0.0.0.0", port=5000, debug=True)
 
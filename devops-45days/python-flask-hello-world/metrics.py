@@ -0,0 +1,85 @@
+"""Prometheus metrics for the Flask hello app.
+
+Request hooks record per-route latency histograms, request and error
+counters and an in-flight gauge, and /metrics serves them in Prometheus
+text format.
+
+Under gunicorn every worker is a separate process with its own counters.
+When PROMETHEUS_MULTIPROC_DIR is set, prometheus_client keeps each worker's
+samples in files in that directory and /metrics aggregates all of them, so
+a scrape sees the whole server rather than whichever worker answered it.
+gunicorn.conf.py clears the directory on startup and cleans up after
+workers that exit.
+"""
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess)
+
+METRICS_PATH = '/metrics'
+
+# Fixed buckets (seconds) sized for a service that answers in well under 100 ms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'Request latency by route',
+    ['method', 'route'], buckets=LATENCY_BUCKETS)
+REQUESTS = Counter(
+    'http_requests_total', 'Requests served by route and status code',
+    ['method', 'route', 'status'])
+ERRORS = Counter(
+    'http_request_errors_total', 'Requests that ended in a 5xx response',
+    ['method', 'route'])
+IN_FLIGHT = Gauge(
+    'http_requests_in_flight', 'Requests currently being served',
+    ['route'], multiprocess_mode='livesum')
+
+def _route():
+    # The rule template (/hello/<name>), not the raw path, keeps label
+    # cardinality bounded no matter what names clients send
+    return request.url_rule.rule if request.url_rule is not None else 'unmatched'
+
+def _before_request():
+    if request.path == METRICS_PATH:
+        return
+    g.metrics_route = _route()
+    g.metrics_start = time.perf_counter()
+    IN_FLIGHT.labels(g.metrics_route).inc()
+
+def _after_request(response):
+    # Flask also runs this for the 500 response it builds from an unhandled
+    # exception, so failures are counted here too
+    route = g.get('metrics_route')
+    if route is None:
+        return response
+    elapsed = time.perf_counter() - g.metrics_start
+    REQUEST_LATENCY.labels(request.method, route).observe(elapsed)
+    REQUESTS.labels(request.method, route, str(response.status_code)).inc()
+    if response.status_code >= 500:
+        ERRORS.labels(request.method, route).inc()
+    return response
+
+def _teardown_request(exc):
+    route = g.pop('metrics_route', None)
+    if route is not None:
+        IN_FLIGHT.labels(route).dec()
+
+def _registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+def metrics():
+    """Expose all collected metrics in Prometheus text format"""
+    return Response(generate_latest(_registry()), content_type=CONTENT_TYPE_LATEST)
+
+def init_metrics(app):
+    """Install the request hooks and the /metrics endpoint on a Flask app"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.add_url_rule(METRICS_PATH, 'metrics', metrics)
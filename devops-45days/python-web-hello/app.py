@@ -2,9 +2,14 @@
 
 from flask import Flask
 
+from metrics import init_metrics
+
 # Create Flask application instance
 app = Flask(__name__)
 
+# Per-route latency histograms and counters, served at /metrics
+init_metrics(app)
+
 @app.route('/')
 def hello_world():
     """Return Hello World message for the root URL"""
@@ -16,5 +21,6 @@ def hello_name(name):
     return f"Hello {name}!"
 
 if __name__ == '__main__':
-    # Run the Flask development server
+    # Run the Flask development server (production runs under gunicorn,
+    # see gunicorn.conf.py)
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Async (ASGI) variant of the hello service.
+
+Serves the same routes as app.py without a framework, so it can run under
+an event-loop server such as Uvicorn:
+
+    uvicorn asgi_app:app --workers 4 --port 5000
+
+Rendered /hello/<name> responses are kept in a bounded LRU cache, so
+repeated names skip building the greeting again. /cache-stats reports the
+cache's hit rate for the worker that answers.
+
+Requests are recorded in the same Prometheus metrics as the Flask app (see
+metrics.py) and served at /metrics. With PROMETHEUS_MULTIPROC_DIR set to an
+empty directory, /metrics aggregates all Uvicorn workers.
+"""
+import json
+import os
+import time
+from functools import lru_cache
+
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest, multiprocess
+
+from metrics import ERRORS, IN_FLIGHT, METRICS_PATH, REQUEST_LATENCY, REQUESTS, metrics_registry
+
+HELLO_CACHE_SIZE = int(os.environ.get('HELLO_CACHE_SIZE', '1024'))
+
+TEXT_HEADERS = [(b'content-type', b'text/html; charset=utf-8')]
+JSON_HEADERS = [(b'content-type', b'application/json')]
+
+ROOT_BODY = b'Hello World'
+NOT_FOUND_BODY = b'Not Found'
+
+@lru_cache(maxsize=HELLO_CACHE_SIZE)
+def render_hello(name):
+    """Return the encoded greeting for name (cached, bounded to HELLO_CACHE_SIZE entries)"""
+    return f'Hello {name}!'.encode()
+
+def cache_stats():
+    info = render_hello.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        'hits': info.hits,
+        'misses': info.misses,
+        'size': info.currsize,
+        'max_size': info.maxsize,
+        'hit_rate': info.hits / lookups if lookups else 0.0,
+    }
+
+def match(path):
+    """Return (route label, handler) for a request path.
+
+    The label is the rule template Flask reports (see metrics.py), so both
+    apps produce the same series; the handler returns (status, headers, body).
+    """
+    if path == '/':
+        return '/', lambda: (200, TEXT_HEADERS, ROOT_BODY)
+    if path.startswith('/hello/'):
+        name = path[len('/hello/'):]
+        # Like Flask's <name> converter: one non-empty path segment
+        if name and '/' not in name:
+            return '/hello/<name>', lambda: (200, TEXT_HEADERS, render_hello(name))
+    if path == '/cache-stats':
+        return '/cache-stats', lambda: (200, JSON_HEADERS, json.dumps(cache_stats()).encode())
+    return 'unmatched', lambda: (404, TEXT_HEADERS, NOT_FOUND_BODY)
+
+def method_not_allowed():
+    return 405, TEXT_HEADERS, b'Method Not Allowed'
+
+async def respond(send, method, status, headers, body):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': headers + [(b'content-length', str(len(body)).encode())],
+    })
+    await send({'type': 'http.response.body', 'body': b'' if method == 'HEAD' else body})
+
+async def app(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Drop this worker's live gauges; its counters and histograms are kept
+                if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+                    multiprocess.mark_process_dead(os.getpid())
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    if scope['type'] != 'http':
+        return
+
+    method = scope['method']
+    if method not in ('GET', 'HEAD'):
+        rule, handler = 'unmatched', method_not_allowed
+    elif scope['path'] == METRICS_PATH:
+        await respond(send, method, 200, [(b'content-type', CONTENT_TYPE_LATEST.encode())],
+                      generate_latest(metrics_registry()))
+        return
+    else:
+        rule, handler = match(scope['path'])
+
+    IN_FLIGHT.labels(rule).inc()
+    start = time.perf_counter()
+    status = 500  # unless the handler returns
+    try:
+        status, headers, body = handler()
+        await respond(send, method, status, headers, body)
+    finally:
+        REQUEST_LATENCY.labels(method, rule).observe(time.perf_counter() - start)
+        REQUESTS.labels(method, rule, str(status)).inc()
+        if status >= 500:
+            ERRORS.labels(method, rule).inc()
+        IN_FLIGHT.labels(rule).dec()
+
+if __name__ == '__main__':
+    import uvicorn
+    uvicorn.run('asgi_app:app', host='0.0.0.0', port=int(os.environ.get('PORT', '5000')),
+                workers=int(os.environ.get('WEB_CONCURRENCY', '1')))
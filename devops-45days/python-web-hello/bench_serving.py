@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""Compare the WSGI (Flask + Gunicorn) and ASGI (Uvicorn) hello services under load.
+
+Starts each server locally with the same number of worker processes and
+the same instrumentation (both record Prometheus metrics into a fresh
+multiprocess directory, as in production), then drives it with concurrent
+keep-alive HTTP/1.1 clients requesting /hello/<name> for a fixed duration,
+and reports requests per second and latency percentiles (p50 / p99).
+
+    python bench_serving.py --workers 4 --connections 64 --duration 10
+    python bench_serving.py --only asgi --names 50 --json results.json
+
+The load generator is asyncio-based and can be spread over several
+processes (--client-processes) so the client is not the bottleneck.
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def server_command(kind, port, workers, threads):
+    if kind == 'wsgi':
+        # Worker recycling is off: Uvicorn has no equivalent, and a restart
+        # mid-run would show up as a latency spike on one side only
+        return [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'], {
+            'BIND': f'127.0.0.1:{port}', 'WEB_CONCURRENCY': str(workers),
+            'GUNICORN_THREADS': str(threads), 'GUNICORN_ACCESS_LOG': '', 'GUNICORN_LOG_LEVEL': 'warning',
+            'GUNICORN_MAX_REQUESTS': '0',
+        }
+    return [sys.executable, '-m', 'uvicorn', 'asgi_app:app', '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(workers), '--no-access-log', '--log-level', 'warning'], {}
+
+def wait_until_listening(port, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'server did not start listening on port {port}')
+
+async def read_response(reader):
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        name, _, value = line.partition(b':')
+        if name.strip().lower() == b'content-length':
+            length = int(value)
+    if length:
+        await reader.readexactly(length)
+    return status
+
+async def client(port, deadline, names, latencies, errors):
+    """One keep-alive connection sending requests back to back until the deadline"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    rng = random.Random()
+    try:
+        while time.perf_counter() < deadline:
+            name = rng.choice(names)
+            request = f'GET /hello/{name} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode()
+            start = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append(status)
+    finally:
+        writer.close()
+
+async def drive(port, connections, duration, names):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, deadline, names, latencies, errors) for _ in range(connections)))
+    return latencies, len(errors)
+
+def client_process(args):
+    port, connections, duration, names = args
+    return asyncio.run(drive(port, connections, duration, names))
+
+def run_load(port, connections, duration, names, processes):
+    per_process = [connections // processes + (1 if i < connections % processes else 0)
+                   for i in range(processes)]
+    jobs = [(port, n, duration, names) for n in per_process if n]
+    if len(jobs) == 1:
+        return client_process(jobs[0])
+    with multiprocessing.Pool(len(jobs)) as pool:
+        results = pool.map(client_process, jobs)
+    return [l for lat, _ in results for l in lat], sum(e for _, e in results)
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def benchmark(kind, args):
+    port = free_port()
+    command, env = server_command(kind, port, args.workers, args.threads)
+    with tempfile.TemporaryDirectory(prefix=f'bench-{kind}-metrics-') as metrics_dir:
+        env['PROMETHEUS_MULTIPROC_DIR'] = metrics_dir
+        server = subprocess.Popen(command, cwd=APP_DIR, env=dict(os.environ, **env))
+        try:
+            wait_until_listening(port)
+            names = [f'user{i}' for i in range(args.names)]
+            run_load(port, args.connections, args.warmup, names, args.client_processes)
+            latencies, errors = run_load(port, args.connections, args.duration, names, args.client_processes)
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    latencies.sort()
+    return {
+        'server': kind,
+        'requests': len(latencies),
+        'errors': errors,
+        'rps': len(latencies) / args.duration,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--only', choices=('wsgi', 'asgi'), help='benchmark just one server')
+    parser.add_argument('--workers', type=int, default=2, help='server worker processes (default: 2)')
+    parser.add_argument('--threads', type=int, default=2, help='threads per Gunicorn worker (default: 2)')
+    parser.add_argument('--connections', type=int, default=32, help='concurrent keep-alive clients (default: 32)')
+    parser.add_argument('--duration', type=float, default=10.0, help='measured seconds per server (default: 10)')
+    parser.add_argument('--warmup', type=float, default=2.0, help='unmeasured seconds before each run')
+    parser.add_argument('--names', type=int, default=100, help='distinct /hello/<name> values (default: 100)')
+    parser.add_argument('--client-processes', type=int, default=1,
+                        help='processes generating load (default: 1)')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    kinds = [args.only] if args.only else ['wsgi', 'asgi']
+    results = [benchmark(kind, args) for kind in kinds]
+
+    print(f"{'server':<8}{'req/s':>12}{'p50 ms':>10}{'p99 ms':>10}{'requests':>11}{'errors':>8}")
+    for r in results:
+        print(f"{r['server']:<8}{r['rps']:>12.0f}{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['requests']:>11}{r['errors']:>8}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': vars(args), 'results': results}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
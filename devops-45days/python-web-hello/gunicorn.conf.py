@@ -0,0 +1,88 @@
+# Gunicorn configuration for running the app in production
+#
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# Every setting can be overridden from the environment, so the same image
+# can be sized per deployment without rebuilding.
+import math
+import os
+
+def cgroup_cpu_limit():
+    """CPU limit from the cgroup CFS quota (Docker --cpus, Kubernetes CPU
+    limits) as a number of CPUs, or None when there is no quota"""
+    try:
+        # cgroup v2: "<quota> <period>", or "max <period>" when unlimited
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        return None if quota == 'max' else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: a quota of -1 means unlimited
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota = int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period = int(f.read())
+    except (OSError, ValueError):
+        return None
+    return quota / period if quota > 0 else None
+
+def cpu_count():
+    """CPUs this process may use: the affinity mask (cpuset pinning), capped
+    by the cgroup CPU quota rounded up, since sched_getaffinity ignores it
+    and a container limited to 2 CPUs would otherwise see every host core"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return cpus
+
+# Listen address
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+backlog = int(os.environ.get('GUNICORN_BACKLOG', '2048'))
+
+# One process per available CPU (see cpu_count): the app is CPU-bound, so more processes than cores
+# (or many threads per process, which share one GIL) only add context
+# switching. Two threads let a worker keep serving while another request
+# waits on a slow client; raise GUNICORN_THREADS if the app starts doing
+# real I/O (database, upstream calls)
+workers = int(os.environ.get('WEB_CONCURRENCY', str(cpu_count())))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', '2'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+
+# Import the app once in the master so workers fork with it already loaded
+preload_app = True
+
+# On SIGTERM, stop accepting connections and give in-flight requests this
+# long to finish before workers are killed
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Recycle workers periodically to contain slow memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '10000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '1000'))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-') or None  # empty disables
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# Metrics: with PROMETHEUS_MULTIPROC_DIR set, each worker writes its samples
+# to that directory and /metrics aggregates them (see metrics.py)
+
+def on_starting(server):
+    """Start from an empty metrics directory so old workers' samples don't leak in"""
+    path = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if path:
+        os.makedirs(path, exist_ok=True)
+        for name in os.listdir(path):
+            os.remove(os.path.join(path, name))
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges; its counters and histograms are kept"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)